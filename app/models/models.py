@@ -162,8 +162,8 @@ class TimetableEntry(Base):
     # Assignment information
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
     year_section_id = Column(Integer, ForeignKey("year_sections.id"), nullable=False)
-    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
-    faculty_id = Column(Integer, ForeignKey("faculty.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=True)  # None for club slots
+    faculty_id = Column(Integer, ForeignKey("faculty.id"), nullable=True)  # None for club slots
     
     # Room assignment
     classroom_id = Column(Integer, ForeignKey("classrooms.id"), nullable=True)
@@ -189,6 +189,8 @@ class TimetableEntry(Base):
         Index("ix_timetable_faculty_day_period", "faculty_id", "day_of_week", "period_number"),
         Index("ix_timetable_classroom_day_period", "classroom_id", "day_of_week", "period_number"),
         Index("ix_timetable_labroom_day_period", "labroom_id", "day_of_week", "period_number"),
+        Index("ix_timetable_session_type", "session_type"),
+        Index("ix_timetable_branch_section_day_period", "branch_id", "year_section_id", "day_of_week", "period_number"),
     )
 
 
@@ -4,6 +4,7 @@ Frozen spec compliant (6 days × 7 periods, deterministic grid).
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Dict, List
@@ -33,6 +34,11 @@ from app.services.validators import ConstraintValidator
 
 router = APIRouter(prefix="/api/timetable", tags=["timetable"])
 
+# Frozen grid axes (Mon–Sat × P1–P7), built once at import
+GRID_DAYS = tuple(d.value for d in DayOfWeek)
+GRID_PERIODS = tuple(range(1, 8))
+SLOTS_PER_WEEK = len(GRID_DAYS) * len(GRID_PERIODS)
+
 # =========================================================
 # GENERATE TIMETABLE
 # =========================================================
@@ -62,9 +68,8 @@ async def generate_timetable(
         if request.include_clubs:
             scheduler.schedule_clubs()
 
-        # Final conflict validation
-        validator = ConstraintValidator(db)
-        is_valid, conflicts = validator.validate_full_schedule()
+        # Final conflict validation; reuses schedule_all's result unless clubs were added
+        is_valid, conflicts = scheduler.validate_schedule()
 
         # Compute final success
         success = success and is_valid
@@ -233,10 +238,7 @@ async def get_branch_timetable_matrix(
     try:
         branch, ys = _get_branch_section(db, branch_code, year, section)
 
-        days = [d.value for d in DayOfWeek]
-        periods = list(range(1, 8))
-
-        grid = {day: {p: None for p in periods} for day in days}
+        grid = {day: dict.fromkeys(GRID_PERIODS) for day in GRID_DAYS}
 
         entries = db.query(TimetableEntry).filter(
             TimetableEntry.branch_id == branch.id,
@@ -258,8 +260,8 @@ async def get_branch_timetable_matrix(
             "branch": branch_code,
             "year": year,
             "section": section,
-            "days": days,
-            "periods": periods,
+            "days": list(GRID_DAYS),
+            "periods": list(GRID_PERIODS),
             "grid": grid,
         }
 
@@ -337,18 +339,28 @@ async def get_schedule_statistics(db: Session = Depends(get_db)):
     Timetable resource utilization statistics.
     """
     try:
-        total_entries = db.query(TimetableEntry).count()
-
-        def count_type(t):
-            return db.query(TimetableEntry).filter(
-                TimetableEntry.session_type == t
-            ).count()
-
-        lectures = count_type(SessionType.LECTURE)
-        tutorials = count_type(SessionType.TUTORIAL)
-        labs = count_type(SessionType.LAB)
-        seminars = count_type(SessionType.SEMINAR)
-        clubs = count_type(SessionType.CLUB)
+        # One GROUP BY pass: rows per session type, plus non-null resource columns
+        by_type = {t: 0 for t in SessionType}
+        faculty_slots = classroom_slots = labroom_slots = 0
+        rows = db.query(
+            TimetableEntry.session_type,
+            func.count(TimetableEntry.id),
+            func.count(TimetableEntry.faculty_id),
+            func.count(TimetableEntry.classroom_id),
+            func.count(TimetableEntry.labroom_id),
+        ).group_by(TimetableEntry.session_type).all()
+        for session_type, entries, with_faculty, with_classroom, with_labroom in rows:
+            by_type[session_type] = entries
+            faculty_slots += with_faculty
+            classroom_slots += with_classroom
+            labroom_slots += with_labroom
+
+        total_entries = sum(by_type.values())
+        lectures = by_type[SessionType.LECTURE]
+        tutorials = by_type[SessionType.TUTORIAL]
+        labs = by_type[SessionType.LAB]
+        seminars = by_type[SessionType.SEMINAR]
+        clubs = by_type[SessionType.CLUB]
 
         total_subjects = db.query(Subject).filter(Subject.is_active == True).count()
         total_branches = db.query(Branch).count()
@@ -356,21 +368,9 @@ async def get_schedule_statistics(db: Session = Depends(get_db)):
         total_classrooms = db.query(Classroom).filter(Classroom.is_active == True).count()
         total_labrooms = db.query(LabRoom).filter(LabRoom.is_active == True).count()
 
-        slots_per_week = 42  # 6 × 7
-
-        faculty_slots = db.query(TimetableEntry).filter(
-            TimetableEntry.faculty_id.isnot(None)
-        ).count()
-        classroom_slots = db.query(TimetableEntry).filter(
-            TimetableEntry.classroom_id.isnot(None)
-        ).count()
-        labroom_slots = db.query(TimetableEntry).filter(
-            TimetableEntry.labroom_id.isnot(None)
-        ).count()
-
-        faculty_util = min(100, (faculty_slots / (total_faculty * slots_per_week)) * 100) if total_faculty else 0
-        classroom_util = min(100, (classroom_slots / (total_classrooms * slots_per_week)) * 100) if total_classrooms else 0
-        labroom_util = min(100, (labroom_slots / (total_labrooms * slots_per_week)) * 100) if total_labrooms else 0
+        faculty_util = min(100, (faculty_slots / (total_faculty * SLOTS_PER_WEEK)) * 100) if total_faculty else 0
+        classroom_util = min(100, (classroom_slots / (total_classrooms * SLOTS_PER_WEEK)) * 100) if total_classrooms else 0
+        labroom_util = min(100, (labroom_slots / (total_labrooms * SLOTS_PER_WEEK)) * 100) if total_labrooms else 0
 
         return ScheduleStatistics(
             total_entries=total_entries,
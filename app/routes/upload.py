@@ -3,10 +3,12 @@ Upload routes for importing Excel master and assignment files into the DB.
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
-from typing import List
+from typing import Dict, List, Tuple
 import pandas as pd
 import io
 from app.models.database import get_db
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from app.models.models import Branch, YearSection, Subject, Faculty
 from datetime import datetime
@@ -21,6 +23,16 @@ BRANCH_MAP = {
     "COMPUTER SCIENCE": "CSE"
 }
 
+# Spreadsheet columns each importer reads (aliases included); read_excel skips the rest
+MASTER_COLUMNS = {
+    "SubjectName", "Subject", "SubjectCode", "Code", "Type",
+    "Lecture", "Lectures", "Tutorial", "Tutorials", "Lab", "Labs", "LabDuration"
+}
+ASSIGNMENT_COLUMNS = {
+    "SubjectName", "Subject", "TeacherName", "Teacher", "Branch", "Dept",
+    "Year", "LecturesPerWeek", "Lectures", "Section"
+}
+
 
 def _normalize_branch(name: str) -> str:
     if not name:
@@ -29,6 +41,7 @@ def _normalize_branch(name: str) -> str:
     return BRANCH_MAP.get(n, n)
 
 
+# The _get_or_create_* helpers flush to assign ids without committing mid-import
 def _get_or_create_branch(db: Session, code: str) -> Branch:
     code_norm = _normalize_branch(code)
     branch = db.query(Branch).filter(Branch.code == code_norm).first()
@@ -36,8 +49,7 @@ def _get_or_create_branch(db: Session, code: str) -> Branch:
         return branch
     branch = Branch(code=code_norm, name=code_norm)
     db.add(branch)
-    db.commit()
-    db.refresh(branch)
+    db.flush()
     return branch
 
 
@@ -52,8 +64,7 @@ def _get_or_create_year_section(db: Session, branch: Branch, year: int, section:
         return ys
     ys = YearSection(branch_id=branch.id, year=year, section=section)
     db.add(ys)
-    db.commit()
-    db.refresh(ys)
+    db.flush()
     return ys
 
 
@@ -63,17 +74,31 @@ def _get_or_create_unassigned_faculty(db: Session) -> Faculty:
         return fac
     fac = Faculty(employee_id="UNASSIGNED", name="Unassigned", department="GENERAL")
     db.add(fac)
-    db.commit()
-    db.refresh(fac)
+    db.flush()
     return fac
 
 
+def _forget_rolled_back(*caches: Dict) -> None:
+    """Drop cached objects whose INSERT was undone by a SAVEPOINT rollback."""
+    for cache in caches:
+        for key in [k for k, obj in cache.items() if inspect(obj).transient]:
+            del cache[key]
+
+
+def _column_values(df: pd.DataFrame, *names: str) -> List:
+    """Per-row value of the first listed column holding a truthy cell (None if none)."""
+    columns = [df[n].tolist() for n in names if n in df.columns]
+    if not columns:
+        return [None] * len(df)
+    return [next((v for v in values if v), None) for values in zip(*columns)]
+
+
 @router.post("/master")
 async def import_master(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """Import master subjects Excel into `subjects` table."""
     try:
         contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+        df = pd.read_excel(io.BytesIO(contents), engine="openpyxl", usecols=lambda c: c in MASTER_COLUMNS)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read Excel: {e}")
 
@@ -85,15 +110,34 @@ async def import_master(file: UploadFile = File(...), db: Session = Depends(get_
     default_branch = _get_or_create_branch(db, "GEN")
     default_year_section = _get_or_create_year_section(db, default_branch, 1, "A")
 
+    # Load subjects once and resolve rows against in-memory maps (first match wins)
+    subjects_by_code: Dict[str, Subject] = {}
+    subjects_by_name: Dict[str, Subject] = {}
+    for existing in db.query(Subject).order_by(Subject.id).all():
+        subjects_by_code.setdefault(existing.code, existing)
+        subjects_by_name.setdefault(existing.name, existing)
+
+    new_subjects: List[Subject] = []
+
     # Expected columns: SubjectName | SubjectCode | Type | Lecture | Tutorial | Lab
-    for _, row in df.iterrows():
-        name = (row.get("SubjectName") or row.get("Subject") or "").strip()
-        code = (row.get("SubjectCode") or row.get("Code") or "").strip()
-        typ = (row.get("Type") or "LECTURE").strip().upper()
-        lectures = int(row.get("Lecture") or row.get("Lectures") or 0)
-        tutorials = int(row.get("Tutorial") or row.get("Tutorials") or 0)
-        labs = int(row.get("Lab") or row.get("Labs") or 0)
-        lab_duration = int(row.get("LabDuration") or 2)
+    # Resolve column aliases once per file, then walk plain value lists
+    rows = zip(
+        _column_values(df, "SubjectName", "Subject"),
+        _column_values(df, "SubjectCode", "Code"),
+        _column_values(df, "Type"),
+        _column_values(df, "Lecture", "Lectures"),
+        _column_values(df, "Tutorial", "Tutorials"),
+        _column_values(df, "Lab", "Labs"),
+        _column_values(df, "LabDuration"),
+    )
+    for name_v, code_v, typ_v, lectures_v, tutorials_v, labs_v, lab_duration_v in rows:
+        name = (name_v or "").strip()
+        code = (code_v or "").strip()
+        typ = (typ_v or "LECTURE").strip().upper()
+        lectures = int(lectures_v or 0)
+        tutorials = int(tutorials_v or 0)
+        labs = int(labs_v or 0)
+        lab_duration = int(lab_duration_v or 2)
 
         if not code and not name:
             warnings.append("Skipped empty master row")
@@ -102,9 +146,9 @@ async def import_master(file: UploadFile = File(...), db: Session = Depends(get_
         # Find existing subject by code or name
         subject = None
         if code:
-            subject = db.query(Subject).filter(Subject.code == code).first()
+            subject = subjects_by_code.get(code)
         if not subject and name:
-            subject = db.query(Subject).filter(Subject.name == name).first()
+            subject = subjects_by_name.get(name)
 
         if subject:
             # update counts
@@ -114,7 +158,6 @@ async def import_master(file: UploadFile = File(...), db: Session = Depends(get_
             subject.tutorials_per_week = tutorials
             subject.lab_periods_per_week = labs
             subject.lab_duration = lab_duration
-            db.add(subject)
         else:
             # create new subject with placeholders for branch/year/section/faculty
             subj = Subject(
@@ -130,9 +173,14 @@ async def import_master(file: UploadFile = File(...), db: Session = Depends(get_
                 lab_duration=lab_duration,
                 faculty_id=unassigned_fac.id
             )
-            db.add(subj)
+            new_subjects.append(subj)
+            subject = subj
+        subjects_by_code.setdefault(subject.code, subject)
+        subjects_by_name.setdefault(subject.name, subject)
         subjects_imported += 1
 
+    # Insert all new subjects in one batch
+    db.bulk_save_objects(new_subjects)
     db.commit()
 
     # Trigger regeneration so scheduler uses fresh data
@@ -154,70 +202,106 @@ async def import_assignments(file: UploadFile = File(...), db: Session = Depends
     """Import assignments Excel and create/update linked subjects and faculty."""
     try:
         contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+        df = pd.read_excel(io.BytesIO(contents), engine="openpyxl", usecols=lambda c: c in ASSIGNMENT_COLUMNS)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to read Excel: {e}")
 
     tasks_imported = 0
     warnings: List[str] = []
 
-    for _, row in df.iterrows():
-        subject_name = (row.get("SubjectName") or row.get("Subject") or "").strip()
-        teacher_name = (row.get("TeacherName") or row.get("Teacher") or "Unassigned").strip()
-        branch_raw = (row.get("Branch") or row.get("Dept") or "").strip()
-        year = int(row.get("Year") or 1)
-        lectures = int(row.get("LecturesPerWeek") or row.get("Lectures") or 0)
-        section = (row.get("Section") or "A").strip()
+    # Load subjects and faculty once and resolve rows in memory (first match wins)
+    subjects_by_name: Dict[str, Subject] = {}
+    for existing in db.query(Subject).order_by(Subject.id).all():
+        subjects_by_name.setdefault(existing.name, existing)
+    faculty_by_name: Dict[str, Faculty] = {}
+    for existing in db.query(Faculty).order_by(Faculty.id).all():
+        faculty_by_name.setdefault(existing.name, existing)
+    branches: Dict[str, Branch] = {}
+    year_sections: Dict[Tuple[int, int, str], YearSection] = {}
+    unassigned_fac = None
+
+    rows = zip(
+        _column_values(df, "SubjectName", "Subject"),
+        _column_values(df, "TeacherName", "Teacher"),
+        _column_values(df, "Branch", "Dept"),
+        _column_values(df, "Year"),
+        _column_values(df, "LecturesPerWeek", "Lectures"),
+        _column_values(df, "Section"),
+    )
+    for subject_v, teacher_v, branch_v, year_v, lectures_v, section_v in rows:
+        subject_name = (subject_v or "").strip()
+        teacher_name = (teacher_v or "Unassigned").strip()
+        branch_raw = (branch_v or "").strip()
+        year = int(year_v or 1)
+        lectures = int(lectures_v or 0)
+        section = (section_v or "A").strip()
 
         if not subject_name:
             warnings.append("Skipped assignment with empty subject")
             continue
 
-        # Normalize branch
-        branch_code = _normalize_branch(branch_raw or "GEN")
-        branch = _get_or_create_branch(db, branch_code)
-
-        # Year/Section
-        ys = _get_or_create_year_section(db, branch, year, section)
+        # Each row runs in its own SAVEPOINT so a failing row leaves no partial rows behind
+        auto_created = False
+        try:
+            with db.begin_nested():
+                # Normalize branch
+                branch_code = _normalize_branch(branch_raw or "GEN")
+                branch = branches.get(branch_code)
+                if branch is None:
+                    branch = branches[branch_code] = _get_or_create_branch(db, branch_code)
+
+                # Year/Section
+                ys_key = (branch.id, year, section)
+                ys = year_sections.get(ys_key)
+                if ys is None:
+                    ys = year_sections[ys_key] = _get_or_create_year_section(db, branch, year, section)
+
+                # Find or create subject (prefer matching by name)
+                subject = subjects_by_name.get(subject_name)
+                if not subject:
+                    # Auto-create subject when missing in master
+                    auto_created = True
+                    if unassigned_fac is None:
+                        unassigned_fac = _get_or_create_unassigned_faculty(db)
+                    subject = Subject(
+                        code=subject_name[:8].upper(),
+                        name=subject_name,
+                        branch_id=branch.id,
+                        year=year,
+                        section=section or "A",
+                        lectures_per_week=lectures,
+                        tutorials_per_week=0,
+                        lab_periods_per_week=0,
+                        seminar_periods_per_week=0,
+                        lab_duration=2,
+                        faculty_id=unassigned_fac.id
+                    )
+                    db.add(subject)
+                    subjects_by_name[subject_name] = subject
+
+                # Find or create teacher
+                faculty = faculty_by_name.get(teacher_name)
+                if not faculty:
+                    faculty = Faculty(employee_id=(teacher_name[:10] or "T000"), name=teacher_name)
+                    db.add(faculty)
+                    db.flush()
+                    faculty_by_name[teacher_name] = faculty
+
+                # Update subject mapping to branch/year/section and faculty
+                subject.branch_id = branch.id
+                subject.year = year
+                subject.section = section or "A"
+                subject.lectures_per_week = lectures or subject.lectures_per_week
+                subject.faculty_id = faculty.id
+        except SQLAlchemyError as e:
+            _forget_rolled_back(branches, year_sections, subjects_by_name, faculty_by_name)
+            if unassigned_fac is not None and inspect(unassigned_fac).transient:
+                unassigned_fac = None
+            warnings.append(f"Skipped assignment {subject_name}: {e.__class__.__name__}")
+            continue
 
-        # Find or create subject (prefer matching by name)
-        subject = db.query(Subject).filter(Subject.name == subject_name).first()
-        if not subject:
-            # Auto-create subject when missing in master
+        if auto_created:
             warnings.append(f"{subject_name} missing in master; auto-created")
-            unassigned_fac = _get_or_create_unassigned_faculty(db)
-            subject = Subject(
-                code=subject_name[:8].upper(),
-                name=subject_name,
-                branch_id=branch.id,
-                year=year,
-                section=section or "A",
-                lectures_per_week=lectures,
-                tutorials_per_week=0,
-                lab_periods_per_week=0,
-                seminar_periods_per_week=0,
-                lab_duration=2,
-                faculty_id=unassigned_fac.id
-            )
-            db.add(subject)
-            db.commit()
-            db.refresh(subject)
-
-        # Find or create teacher
-        faculty = db.query(Faculty).filter(Faculty.name == teacher_name).first()
-        if not faculty:
-            faculty = Faculty(employee_id=(teacher_name[:10] or "T000"), name=teacher_name)
-            db.add(faculty)
-            db.commit()
-            db.refresh(faculty)
-
-        # Update subject mapping to branch/year/section and faculty
-        subject.branch_id = branch.id
-        subject.year = year
-        subject.section = section or "A"
-        subject.lectures_per_week = lectures or subject.lectures_per_week
-        subject.faculty_id = faculty.id
-        db.add(subject)
         tasks_imported += 1
 
     db.commit()
@@ -202,8 +202,8 @@ class TimetableEntryBase(BaseModel):
     period_number: int = Field(..., ge=1, le=7)
     branch_id: int
     year_section_id: int
-    subject_id: int
-    faculty_id: int
+    subject_id: Optional[int] = None  # None for club slots
+    faculty_id: Optional[int] = None  # None for club slots
     classroom_id: Optional[int] = None
     labroom_id: Optional[int] = None
     session_type: SessionTypeEnum
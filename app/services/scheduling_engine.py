@@ -3,32 +3,55 @@ Scheduler engine for timetable generation using constraint-based scheduling with
 """
 
 import random
-from typing import List, Dict, Set, Tuple, Optional
-from dataclasses import dataclass
+from collections import defaultdict
+from typing import Callable, List, Dict, Set, Tuple, Optional
+from operator import attrgetter
+from sqlalchemy import exists, func, insert, literal, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from app.models.models import (
     Subject, TimetableEntry, DayOfWeek, SessionType, YearSection,
-    Faculty, Classroom, LabRoom
+    Faculty, Classroom, LabRoom, ConstraintConfig
 )
 from app.services.validators import ConstraintValidator
-from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
 class SchedulingTask:
     """Represents a scheduling task for a subject."""
-    subject_id: int
-    subject_code: str
-    session_type: SessionType
-    count: int  # Number of periods needed
-    duration: int = 1  # Duration in consecutive periods (1 for lecture, 2-3 for lab)
-    priority: int = 0  # Higher = higher priority
     
-    def __lt__(self, other):
-        return self.priority > other.priority
+    # Hand-written rather than dataclass(slots=True), which needs Python 3.10+
+    __slots__ = (
+        "subject_id", "subject_code", "session_type", "count", "duration", "priority",
+        "branch_id", "faculty_id", "year_section_id", "room_id",
+    )
+    
+    def __init__(
+        self,
+        subject_id: int,
+        subject_code: str,
+        session_type: SessionType,
+        count: int,  # Number of periods needed
+        duration: int = 1,  # Duration in consecutive periods (1 for lecture, 2-3 for lab)
+        priority: int = 0,  # Higher = higher priority
+        branch_id: Optional[int] = None,
+        faculty_id: Optional[int] = None,
+        year_section_id: Optional[int] = None,
+        room_id: Optional[int] = None  # Lab room for labs, classroom otherwise
+    ):
+        self.subject_id = subject_id
+        self.subject_code = subject_code
+        self.session_type = session_type
+        self.count = count
+        self.duration = duration
+        self.priority = priority
+        self.branch_id = branch_id
+        self.faculty_id = faculty_id
+        self.year_section_id = year_section_id
+        self.room_id = room_id
 
 
 class SchedulerEngine:
@@ -44,17 +67,48 @@ class SchedulerEngine:
     
     PERIODS = list(range(1, 8))  # 1-7
     
+    MAX_BACKTRACKS = 2000  # Undo budget per attempt before the search falls back to greedy placement
+    RESTARTS = 3  # Fresh attempts for a group of tasks that still has unplaced sessions
+    
     def __init__(self, db: Session, seed: Optional[int] = None):
         self.db = db
         self.validator = ConstraintValidator(db)
         self.seed = seed
-        if seed:
-            random.seed(seed)
+        # Private generator: seeding it does not disturb the process-wide random module
+        self.rng = random.Random(seed)
         
         # Tracking
-        self.scheduled_entries: List[TimetableEntry] = []
+        self.scheduled_entries: List[Dict] = []  # Rows inserted by this engine
         self.failed_subjects: List[Tuple[str, str]] = []  # (subject_code, reason)
         self.backtrack_count = 0
+        
+        # Occupancy bitmasks keyed by (resource_id, day); bit (period - 1) set when busy
+        self.faculty_busy: Dict[Tuple[int, DayOfWeek], int] = defaultdict(int)
+        self.section_busy: Dict[Tuple[int, DayOfWeek], int] = defaultdict(int)
+        self.classroom_busy: Dict[Tuple[int, DayOfWeek], int] = defaultdict(int)
+        self.labroom_busy: Dict[Tuple[int, DayOfWeek], int] = defaultdict(int)
+        
+        # (branch_id, year, section) -> YearSection id, loaded on first use
+        self._year_section_cache: Optional[Dict[Tuple[int, int, str], int]] = None
+        
+        # Candidate slots per session type; club-reserved Thursday periods are never drawn
+        self.lecture_slots = self._open_slots(thursday_reserved=(7,))
+        self.non_club_slots = self._open_slots(thursday_reserved=(1, 7))
+        
+        # validate_full_schedule result, reused until this engine writes again
+        self._validation: Optional[Tuple[bool, List[str]]] = None
+        
+        # (session_type, duration) -> (day, start_period, bits) choices, built on first use
+        self._candidate_cache: Dict[Tuple[SessionType, int], List[Tuple[DayOfWeek, int, int]]] = {}
+    
+    def _open_slots(self, thursday_reserved: Tuple[int, ...]) -> List[Tuple[DayOfWeek, int]]:
+        """All (day, period) pairs except the given Thursday periods."""
+        return [
+            (day, period)
+            for day in self.DAYS
+            for period in self.PERIODS
+            if not (day == DayOfWeek.THURSDAY and period in thursday_reserved)
+        ]
     
     def schedule_all(self, force_clear: bool = False) -> Tuple[bool, Dict]:
         """
@@ -63,22 +117,24 @@ class SchedulerEngine:
         Returns:
             (success: bool, report: dict with metrics)
         """
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
         # Clear existing entries if requested
         if force_clear:
             self.db.query(TimetableEntry).delete()
             self.db.commit()
         
+        self._load_occupancy()
+        
         # Get all subjects
         all_subjects = self.db.query(Subject).filter(Subject.is_active == True).all()
         
         # Compute capacity vs demand metadata
         try:
-            # Determine periods per day from constraint config if present
-            from app.models.models import ConstraintConfig
-            cfg = self.db.query(ConstraintConfig).order_by(ConstraintConfig.id.desc()).first()
-            periods_per_day = cfg.periods_per_day if cfg else 7
+            # Determine periods per day from constraint config if present; only the one column is read
+            periods_per_day = self.db.query(ConstraintConfig.periods_per_day).order_by(
+                ConstraintConfig.id.desc()
+            ).limit(1).scalar() or 7
         except Exception:
             periods_per_day = 7
 
@@ -110,35 +166,45 @@ class SchedulerEngine:
         all_tasks = self._create_scheduling_tasks(all_subjects)
         
         # Sort by priority (labs first)
-        all_tasks.sort()
+        all_tasks.sort(key=attrgetter("priority"), reverse=True)
         
-        # Attempt to schedule each task
-        scheduled_count = 0
+        # Tasks without a year-section or room can never be placed
+        tasks: List[SchedulingTask] = []
         for task in all_tasks:
-            subject = self.db.query(Subject).filter(Subject.id == task.subject_id).first()
-            if not subject:
-                continue
-            
-            success = False
-            if task.session_type == SessionType.LAB:
-                success = self._schedule_lab(subject, task.count, task.duration)
-            elif task.session_type == SessionType.LECTURE:
-                success = self._schedule_lectures(subject, task.count)
-            elif task.session_type == SessionType.TUTORIAL:
-                success = self._schedule_tutorials(subject, task.count)
-            elif task.session_type == SessionType.SEMINAR:
-                success = self._schedule_seminars(subject, task.count)
-            
-            if success:
-                scheduled_count += 1
+            if task.year_section_id is None:
+                self.failed_subjects.append((task.subject_code, "No matching year-section"))
+            elif task.room_id is None:
+                room = "lab room" if task.session_type == SessionType.LAB else "classroom"
+                self.failed_subjects.append((task.subject_code, f"No {room} assigned"))
             else:
-                self.failed_subjects.append((subject.code, f"Failed to schedule all {task.session_type.value}s"))
+                tasks.append(task)
+        
+        placements, unplaced = self._solve(tasks)
+        
+        scheduled_count = 0
+        for index, task in enumerate(tasks):
+            if unplaced.get(index):
+                self.failed_subjects.append((task.subject_code, f"Failed to schedule all {task.session_type.value}s"))
+            else:
+                scheduled_count += 1
+        
+        # Write every placement in one batch; the validator then cross-checks the result
+        entries: List[Dict] = []
+        for index, day, start_period in placements:
+            entries.extend(self._build_entries(tasks[index], day, start_period))
+        self._validation = None
+        try:
+            self._save_entries(entries)
+            self.db.commit()
+        except SQLAlchemyError:
+            # Leave the session usable for the caller; nothing from this run is kept
+            self.db.rollback()
+            raise
         
         # Validate final schedule
-        is_valid, conflicts = self.validator.validate_full_schedule()
+        is_valid, conflicts = self.validate_schedule()
         
-        end_time = datetime.utcnow()
-        generation_time = (end_time - start_time).total_seconds() * 1000
+        generation_time = (time.perf_counter() - start_time) * 1000
         
         report = {
             "success": len(self.failed_subjects) == 0,
@@ -161,6 +227,13 @@ class SchedulerEngine:
         tasks = []
         
         for subject in subjects:
+            resources = {
+                "branch_id": subject.branch_id,
+                "faculty_id": subject.faculty_id,
+                "year_section_id": self._get_year_section_id(subject),
+                "room_id": subject.classroom_id,
+            }
+            
             # Labs have highest priority (priority = 3)
             if subject.lab_periods_per_week > 0:
                 tasks.append(SchedulingTask(
@@ -169,7 +242,8 @@ class SchedulerEngine:
                     session_type=SessionType.LAB,
                     count=subject.lab_periods_per_week,
                     duration=subject.lab_duration,
-                    priority=3
+                    priority=3,
+                    **dict(resources, room_id=subject.labroom_id)
                 ))
             
             # Tutorials next (priority = 2)
@@ -179,7 +253,8 @@ class SchedulerEngine:
                     subject_code=subject.code,
                     session_type=SessionType.TUTORIAL,
                     count=subject.tutorials_per_week,
-                    priority=2
+                    priority=2,
+                    **resources
                 ))
             
             # Lectures (priority = 1)
@@ -189,7 +264,8 @@ class SchedulerEngine:
                     subject_code=subject.code,
                     session_type=SessionType.LECTURE,
                     count=subject.lectures_per_week,
-                    priority=1
+                    priority=1,
+                    **resources
                 ))
             
             # Seminars (priority = 0)
@@ -199,281 +275,432 @@ class SchedulerEngine:
                     subject_code=subject.code,
                     session_type=SessionType.SEMINAR,
                     count=subject.seminar_periods_per_week,
-                    priority=0
+                    priority=0,
+                    **resources
                 ))
         
         return tasks
     
-    def _schedule_lab(self, subject: Subject, count: int, duration: int) -> bool:
-        """Schedule lab sessions with backtracking."""
-        if subject.labroom_id is None:
-            self.failed_subjects.append((subject.code, "No lab room assigned"))
-            return False
-        
-        scheduled = 0
-        attempts = 0
-        max_attempts = len(self.DAYS) * 4  # Generous attempt limit
-        
-        while scheduled < count and attempts < max_attempts:
-            attempts += 1
-            
-            # Choose random day and starting period
-            day = random.choice(self.DAYS)
-            
-            # Determine allowed periods based on day
-            if day == DayOfWeek.THURSDAY:
-                max_start = 5  # P3-P6 with duration 2 means max start is P5
-                start_period = random.randint(3, max_start)
+    def _get_year_section_id(self, subject: Subject) -> Optional[int]:
+        """Resolve a subject's year-section id, loading every id in one query on first use."""
+        if self._year_section_cache is None:
+            rows = self.db.query(YearSection.id, YearSection.branch_id, YearSection.year, YearSection.section)
+            self._year_section_cache = {
+                (branch_id, year, section): year_section_id
+                for year_section_id, branch_id, year, section in rows
+            }
+        return self._year_section_cache.get((subject.branch_id, subject.year, subject.section))
+    
+    def _load_occupancy(self) -> None:
+        """Seed the occupancy bitmasks from entries already in the database."""
+        self.faculty_busy.clear()
+        self.section_busy.clear()
+        self.classroom_busy.clear()
+        self.labroom_busy.clear()
+        
+        rows = self.db.query(
+            TimetableEntry.faculty_id,
+            TimetableEntry.year_section_id,
+            TimetableEntry.classroom_id,
+            TimetableEntry.labroom_id,
+            TimetableEntry.day_of_week,
+            TimetableEntry.period_number,
+            TimetableEntry.session_type,
+        ).yield_per(1000)  # stream rows instead of buffering the whole table
+        for faculty_id, year_section_id, classroom_id, labroom_id, day, period, session_type in rows:
+            bit = 1 << (period - 1)
+            self.section_busy[(year_section_id, day)] |= bit
+            if faculty_id is not None:
+                self.faculty_busy[(faculty_id, day)] |= bit
+            if classroom_id and session_type != SessionType.CLUB:
+                self.classroom_busy[(classroom_id, day)] |= bit
+            if labroom_id:
+                self.labroom_busy[(labroom_id, day)] |= bit
+    
+    def _occupy(
+        self,
+        faculty_id: int,
+        year_section_id: int,
+        room_busy: Dict[Tuple[int, DayOfWeek], int],
+        room_id: int,
+        day: DayOfWeek,
+        bits: int
+    ) -> None:
+        """Mark faculty, year-section and room busy in every period of bits."""
+        self.faculty_busy[(faculty_id, day)] |= bits
+        self.section_busy[(year_section_id, day)] |= bits
+        room_busy[(room_id, day)] |= bits
+    
+    def _release(
+        self,
+        faculty_id: int,
+        year_section_id: int,
+        room_busy: Dict[Tuple[int, DayOfWeek], int],
+        room_id: int,
+        day: DayOfWeek,
+        bits: int
+    ) -> None:
+        """Clear the periods of bits for faculty, year-section and room."""
+        self.faculty_busy[(faculty_id, day)] &= ~bits
+        self.section_busy[(year_section_id, day)] &= ~bits
+        room_busy[(room_id, day)] &= ~bits
+    
+    def _room_busy(self, task: SchedulingTask) -> Dict[Tuple[int, DayOfWeek], int]:
+        """Occupancy map of the room kind a task is held in."""
+        return self.labroom_busy if task.session_type == SessionType.LAB else self.classroom_busy
+    
+    def _candidates(self, task: SchedulingTask) -> List[Tuple[DayOfWeek, int, int]]:
+        """Every (day, start_period, bits) the day/period rules allow for a task; shared, do not mutate."""
+        key = (task.session_type, task.duration)
+        if key not in self._candidate_cache:
+            if task.session_type == SessionType.LAB:
+                candidates = [
+                    (day, start_period, ((1 << task.duration) - 1) << (start_period - 1))
+                    for day in self.DAYS
+                    for start_period in self.PERIODS
+                    if self.validator.is_valid_lab_placement(day, start_period, task.duration)[0]
+                ]
             else:
-                max_start = 6  # P3-P7 with duration 2 means max start is P6
-                start_period = random.randint(3, max_start)
-            
-            # Validate placement
-            can_place, error = self.validator.can_schedule_lab(
-                subject.branch_id,
-                subject.year_section_id,
-                subject.faculty_id,
-                subject.labroom_id,
-                day,
-                start_period,
-                duration
-            )
-            
-            if can_place:
-                # Create entries for each period in the lab
-                for i, period in enumerate(range(start_period, start_period + duration)):
-                    entry = TimetableEntry(
-                        day_of_week=day,
-                        period_number=period,
-                        branch_id=subject.branch_id,
-                        year_section_id=subject.year_section_id,
-                        subject_id=subject.id,
-                        faculty_id=subject.faculty_id,
-                        labroom_id=subject.labroom_id,
-                        session_type=SessionType.LAB
-                    )
-                    self.db.add(entry)
-                
-                scheduled += 1
-        
-        self.db.commit()
-        return scheduled == count
+                # Lectures may use Thursday P1; tutorials and seminars may not
+                slots = self.lecture_slots if task.session_type == SessionType.LECTURE else self.non_club_slots
+                candidates = [(day, period, 1 << (period - 1)) for day, period in slots]
+            self._candidate_cache[key] = candidates
+        return self._candidate_cache[key]
     
-    def _schedule_lectures(self, subject: Subject, count: int) -> bool:
-        """Schedule lecture sessions with backtracking."""
-        if subject.classroom_id is None:
-            self.failed_subjects.append((subject.code, "No classroom assigned"))
-            return False
-        
-        scheduled = 0
-        attempts = 0
-        max_attempts = len(self.DAYS) * 7 * 2
-        
-        while scheduled < count and attempts < max_attempts:
-            attempts += 1
-            
-            day = random.choice(self.DAYS)
-            period = random.choice(self.PERIODS)
-            
-            # Lectures can be in any period, but preferably not after labs
-            if day == DayOfWeek.THURSDAY:
-                if period == 7:  # P7 clubs only
-                    continue
-            
-            can_place, error = self.validator.can_schedule_lecture_or_tutorial(
-                subject.branch_id,
-                subject.year_section_id,
-                subject.faculty_id,
-                subject.classroom_id,
-                day,
-                period
+    def _domain(
+        self,
+        task: SchedulingTask,
+        candidates: List[Tuple[DayOfWeek, int, int]]
+    ) -> List[Tuple[DayOfWeek, int, int]]:
+        """Candidates still free for the task's faculty, year-section and room."""
+        # One combined mask per day, rather than three lookups per candidate
+        room_busy = self._room_busy(task)
+        busy = {
+            day: (
+                self.faculty_busy[(task.faculty_id, day)]
+                | self.section_busy[(task.year_section_id, day)]
+                | room_busy[(task.room_id, day)]
             )
-            
-            if can_place:
-                entry = TimetableEntry(
-                    day_of_week=day,
-                    period_number=period,
-                    branch_id=subject.branch_id,
-                    year_section_id=subject.year_section_id,
-                    subject_id=subject.id,
-                    faculty_id=subject.faculty_id,
-                    classroom_id=subject.classroom_id,
-                    session_type=SessionType.LECTURE
-                )
-                self.db.add(entry)
-                scheduled += 1
-        
-        self.db.commit()
-        return scheduled == count
+            for day in self.DAYS
+        }
+        return [candidate for candidate in candidates if not busy[candidate[0]] & candidate[2]]
     
-    def _schedule_tutorials(self, subject: Subject, count: int) -> bool:
-        """Schedule tutorial sessions with backtracking."""
-        if subject.classroom_id is None:
-            self.failed_subjects.append((subject.code, "No classroom assigned"))
-            return False
-        
-        scheduled = 0
-        attempts = 0
-        max_attempts = len(self.DAYS) * 7 * 2
+    def _resource_keys(self, task: SchedulingTask) -> Tuple[Tuple[str, int], ...]:
+        """The faculty, year-section and room a task holds while placed."""
+        room_kind = "labroom" if task.session_type == SessionType.LAB else "classroom"
+        return (("faculty", task.faculty_id), ("section", task.year_section_id), (room_kind, task.room_id))
+    
+    def _neighbours(self, tasks: List[SchedulingTask]) -> List[List[int]]:
+        """For each task, the tasks sharing its faculty, year-section or room (itself included)."""
+        by_resource: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        for index, task in enumerate(tasks):
+            for key in self._resource_keys(task):
+                by_resource[key].append(index)
+        
+        return [
+            sorted({other for key in self._resource_keys(task) for other in by_resource[key]})
+            for task in tasks
+        ]
+    
+    def _components(self, neighbours: List[List[int]]) -> List[List[int]]:
+        """Split task indices into groups that share no faculty, year-section or room."""
+        seen: Set[int] = set()
+        components = []
+        for start in range(len(neighbours)):
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            for index in component:  # grows while iterating: breadth-first walk
+                for other in neighbours[index]:
+                    if other not in seen:
+                        seen.add(other)
+                        component.append(other)
+            components.append(component)
+        return components
+    
+    def _solve(
+        self,
+        tasks: List[SchedulingTask]
+    ) -> Tuple[List[Tuple[int, DayOfWeek, int]], Dict[int, int]]:
+        """
+        Place every session of every task using forward checking with MRV ordering.
+        
+        Each step branches on the task whose live domain has the least room for
+        the sessions it still needs, ties broken by priority and then at random,
+        and tries first the slots fewest neighbouring options compete for (LCV).
+        A placement immediately shrinks the domains of the tasks sharing its
+        faculty, year-section or room; a task left with fewer free slots than
+        sessions is a dead end.
+        
+        Dead ends are resolved by conflict-directed backjumping: every occupied
+        slot remembers the choice point holding it, so the failing task's
+        conflict set is the choice points blocking its candidates. The search
+        jumps straight to the deepest of them, skipping independent decisions,
+        and merges the rest of the set into that choice point's own so a later
+        failure there can jump further back. An empty conflict set means only
+        existing entries are in the way and the task is given up at once.
+        Jumps are bounded by MAX_BACKTRACKS; after that the search degrades to
+        greedy placement. Groups of tasks that share no resource are searched
+        one after another as independent problems, and a group left with
+        unplaced sessions is searched again from scratch with fresh random
+        choices, up to RESTARTS times, keeping the attempt that places most.
+        
+        Returns (task index, day, start_period) per placed session and the
+        number of unplaced sessions per task index.
+        """
+        candidates = [self._candidates(task) for task in tasks]
+        resource_keys = [self._resource_keys(task) for task in tasks]
+        neighbours = self._neighbours(tasks)
+        tiebreak = [self.rng.random() for _ in tasks]
+        domains = {index: self._domain(task, candidates[index]) for index, task in enumerate(tasks)}
+        remaining: Dict[int, int] = {}
+        unplaced: Dict[int, int] = {}
+        
+        # Choice points: [task index, shuffled options, position of the option in use, conflict set]
+        stack: List[list] = []
+        # (resource key, day, period) -> depth of the choice point occupying it
+        owners: Dict[Tuple[Tuple[str, int], DayOfWeek, int], int] = {}
+        
+        def refresh(index: int) -> None:
+            for other in neighbours[index]:
+                if other in remaining:
+                    domains[other] = self._domain(tasks[other], candidates[other])
+        
+        def place(index: int, option: Tuple[DayOfWeek, int, int]) -> None:
+            task = tasks[index]
+            day, start_period, bits = option
+            self._occupy(task.faculty_id, task.year_section_id, self._room_busy(task), task.room_id, day, bits)
+            depth = len(stack) - 1
+            for key in resource_keys[index]:
+                for period in range(start_period, start_period + task.duration):
+                    owners[(key, day, period)] = depth
+            remaining[index] -= 1
+            if not remaining[index]:
+                del remaining[index]
+            refresh(index)
+        
+        def unplace(index: int, option: Tuple[DayOfWeek, int, int]) -> None:
+            task = tasks[index]
+            day, start_period, bits = option
+            self._release(task.faculty_id, task.year_section_id, self._room_busy(task), task.room_id, day, bits)
+            for key in resource_keys[index]:
+                for period in range(start_period, start_period + task.duration):
+                    del owners[(key, day, period)]
+            # Re-queue this task's given-up sessions when one of its own placements is undone
+            remaining[index] = remaining.get(index, 0) + unplaced.pop(index, 0) + 1
+            refresh(index)
+        
+        def culprits(index: int) -> Set[int]:
+            # Choice points occupying any slot the task's candidates need
+            duration = tasks[index].duration
+            return {
+                owners[(key, day, period)]
+                for day, start_period, _ in candidates[index]
+                for period in range(start_period, start_period + duration)
+                for key in resource_keys[index]
+                if (key, day, period) in owners
+            }
         
-        while scheduled < count and attempts < max_attempts:
-            attempts += 1
-            
-            day = random.choice(self.DAYS)
-            period = random.choice(self.PERIODS)
+        def eliminated(index: int) -> Callable[[Tuple[DayOfWeek, int, int]], int]:
+            # Count, per (day, period), the neighbours' live options that would use it
+            demand: Dict[Tuple[DayOfWeek, int], int] = defaultdict(int)
+            for other in neighbours[index]:
+                if other in remaining and other != index:
+                    duration = tasks[other].duration
+                    for day, start_period, _ in domains[other]:
+                        for period in range(start_period, start_period + duration):
+                            demand[(day, period)] += 1
             
-            if day == DayOfWeek.THURSDAY:
-                if period in [1, 7]:  # Clubs only
-                    continue
-            
-            can_place, error = self.validator.can_schedule_lecture_or_tutorial(
-                subject.branch_id,
-                subject.year_section_id,
-                subject.faculty_id,
-                subject.classroom_id,
-                day,
-                period
+            duration = tasks[index].duration
+            return lambda option: sum(
+                demand.get((option[0], period), 0)
+                for period in range(option[1], option[1] + duration)
             )
-            
-            if can_place:
-                entry = TimetableEntry(
-                    day_of_week=day,
-                    period_number=period,
-                    branch_id=subject.branch_id,
-                    year_section_id=subject.year_section_id,
-                    subject_id=subject.id,
-                    faculty_id=subject.faculty_id,
-                    classroom_id=subject.classroom_id,
-                    session_type=SessionType.TUTORIAL
-                )
-                self.db.add(entry)
-                scheduled += 1
         
-        self.db.commit()
-        return scheduled == count
-    
-    def _schedule_seminars(self, subject: Subject, count: int) -> bool:
-        """Schedule seminar sessions with backtracking."""
-        if subject.classroom_id is None:
-            self.failed_subjects.append((subject.code, "No classroom assigned"))
+        def backjump(conflicts: Set[int]) -> bool:
+            while conflicts and self.backtrack_count < limit:
+                self.backtrack_count += 1
+                target = max(conflicts)
+                
+                # Choice points above the culprit did not cause the failure; drop them
+                while len(stack) > target + 1:
+                    index, options, position, _ = stack.pop()
+                    unplace(index, options[position])
+                
+                point = stack[-1]
+                index, options, position, conflict_set = point
+                conflict_set |= conflicts - {target}
+                unplace(index, options[position])
+                if position + 1 < len(options):
+                    point[2] = position + 1
+                    place(index, options[position + 1])
+                    return True
+                
+                # Culprit is out of options: blame whatever constrained it in turn
+                stack.pop()
+                conflicts = conflict_set | culprits(index)
             return False
         
-        scheduled = 0
-        attempts = 0
-        max_attempts = len(self.DAYS) * 7 * 2
-        
-        while scheduled < count and attempts < max_attempts:
-            attempts += 1
-            
-            day = random.choice(self.DAYS)
-            period = random.choice(self.PERIODS)
+        # Components share no resource, so each is searched on its own: a dead end in one
+        # never unwinds another, and MRV only scans the tasks that can interact
+        placements: List[Tuple[int, DayOfWeek, int]] = []
+        for component in self._components(neighbours):
+            best: Optional[List[Tuple[int, Tuple[DayOfWeek, int, int]]]] = None
+            best_unplaced: Dict[int, int] = {}
             
-            if day == DayOfWeek.THURSDAY:
-                if period in [1, 7]:  # Clubs only
-                    continue
+            for attempt in range(self.RESTARTS):
+                if attempt:
+                    # Restart from the component's initial state with fresh tie-breaks
+                    while stack:
+                        index, options, position, _ = stack.pop()
+                        unplace(index, options[position])
+                    # Unwinding only refreshes tasks still in play; given-up tasks keep stale domains
+                    for index in component:
+                        domains[index] = self._domain(tasks[index], candidates[index])
+                        tiebreak[index] = self.rng.random()
+                remaining = {index: tasks[index].count for index in component if tasks[index].count > 0}
+                owners.clear()
+                limit = self.backtrack_count + self.MAX_BACKTRACKS
+                
+                while remaining:
+                    index = min(
+                        remaining,
+                        key=lambda i: (len(domains[i]) - remaining[i], -tasks[i].priority, tiebreak[i])
+                    )
+                    if len(domains[index]) < remaining[index] and backjump(culprits(index)):
+                        continue
+                    
+                    if not domains[index]:
+                        unplaced[index] = remaining.pop(index)
+                        continue
+                    
+                    # Least-constraining value first; the random rotation breaks ties
+                    domain = domains[index]
+                    offset = self.rng.randrange(len(domain))
+                    options = domain[offset:] + domain[:offset]
+                    options.sort(key=eliminated(index))
+                    stack.append([index, options, 0, set()])
+                    place(index, options[0])
+                
+                missing = {index: unplaced.pop(index) for index in component if index in unplaced}
+                if best is None or sum(missing.values()) < sum(best_unplaced.values()):
+                    best = [(index, options[position]) for index, options, position, _ in stack]
+                    best_unplaced = missing
+                    best_attempt = attempt
+                if not missing:
+                    break
             
-            can_place, error = self.validator.can_schedule_seminar(
-                subject.branch_id,
-                subject.year_section_id,
-                subject.faculty_id,
-                subject.classroom_id,
-                day,
-                period
-            )
+            # Leave the occupancy masks holding the attempt that is kept
+            if best_attempt != attempt:
+                while stack:
+                    index, options, position, _ = stack.pop()
+                    unplace(index, options[position])
+                for index, (day, _, bits) in best:
+                    task = tasks[index]
+                    self._occupy(task.faculty_id, task.year_section_id, self._room_busy(task), task.room_id, day, bits)
+            stack.clear()
             
-            if can_place:
-                entry = TimetableEntry(
-                    day_of_week=day,
-                    period_number=period,
-                    branch_id=subject.branch_id,
-                    year_section_id=subject.year_section_id,
-                    subject_id=subject.id,
-                    faculty_id=subject.faculty_id,
-                    classroom_id=subject.classroom_id,
-                    session_type=SessionType.SEMINAR
-                )
-                self.db.add(entry)
-                scheduled += 1
+            unplaced.update(best_unplaced)
+            placements.extend((index, day, start_period) for index, (day, start_period, _) in best)
         
-        self.db.commit()
-        return scheduled == count
+        return placements, unplaced
+    
+    def _build_entries(self, task: SchedulingTask, day: DayOfWeek, start_period: int) -> List[Dict]:
+        """Timetable rows for one placed session, one per period it spans."""
+        is_lab = task.session_type == SessionType.LAB
+        return [
+            {
+                "day_of_week": day,
+                "period_number": period,
+                "branch_id": task.branch_id,
+                "year_section_id": task.year_section_id,
+                "subject_id": task.subject_id,
+                "faculty_id": task.faculty_id,
+                "classroom_id": None if is_lab else task.room_id,
+                "labroom_id": task.room_id if is_lab else None,
+                "session_type": task.session_type,
+            }
+            for period in range(start_period, start_period + task.duration)
+        ]
+    
+    def _save_entries(self, rows: List[Dict]) -> None:
+        """
+        Insert a batch of timetable_entries rows with one Core executemany INSERT.
+        Every row must carry the same keys; the statement is compiled from the first.
+        """
+        if rows:
+            self.db.execute(insert(TimetableEntry.__table__), rows)
+            self.scheduled_entries.extend(rows)
     
     def schedule_clubs(self) -> bool:
-        """Schedule fixed club activities on Thursday P1 and P7."""
+        """
+        Schedule fixed club activities on Thursday P1 and P7.
+        Every year-section of a branch that has subjects gets both slots, in one
+        INSERT ... SELECT per period; a section whose slot is already taken is skipped.
+        """
         try:
-            # Get all branches
-            branches = self.db.query(Subject.branch_id).distinct().all()
+            columns = TimetableEntry.__table__.c
+            branches_with_subjects = select(Subject.branch_id).distinct()
             
-            for (branch_id,) in branches:
-                # Get year-sections for this branch
-                year_sections = self.db.query(YearSection).filter(
-                    YearSection.branch_id == branch_id
-                ).all()
+            for period in (1, 7):
+                # Lectures may hold Thursday P1, so a section can end up without that club
+                slot_taken = exists().where(
+                    TimetableEntry.year_section_id == YearSection.id,
+                    TimetableEntry.day_of_week == DayOfWeek.THURSDAY,
+                    TimetableEntry.period_number == period,
+                )
+                rows = select(
+                    literal(DayOfWeek.THURSDAY, columns.day_of_week.type),
+                    literal(period),
+                    YearSection.branch_id,
+                    YearSection.id,
+                    literal(SessionType.CLUB, columns.session_type.type),
+                ).where(YearSection.branch_id.in_(branches_with_subjects), ~slot_taken)
                 
-                for year_section in year_sections:
-                    # Club for P1
-                    entry_p1 = TimetableEntry(
-                        day_of_week=DayOfWeek.THURSDAY,
-                        period_number=1,
-                        branch_id=branch_id,
-                        year_section_id=year_section.id,
-                        subject_id=None,
-                        faculty_id=None,
-                        session_type=SessionType.CLUB
-                    )
-                    self.db.add(entry_p1)
-                    
-                    # Club for P7
-                    entry_p7 = TimetableEntry(
-                        day_of_week=DayOfWeek.THURSDAY,
-                        period_number=7,
-                        branch_id=branch_id,
-                        year_section_id=year_section.id,
-                        subject_id=None,
-                        faculty_id=None,
-                        session_type=SessionType.CLUB
-                    )
-                    self.db.add(entry_p7)
+                self.db.execute(insert(TimetableEntry.__table__).from_select(
+                    ["day_of_week", "period_number", "branch_id", "year_section_id",
+                     "session_type"],
+                    rows,
+                ))
             
+            self._validation = None
             self.db.commit()
             return True
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error scheduling clubs: {str(e)}")
             return False
     
-    def get_scheduling_report(self) -> Dict:
-        """Get detailed scheduling report."""
-        total_entries = self.db.query(TimetableEntry).count()
-        
-        lectures = self.db.query(TimetableEntry).filter(
-            TimetableEntry.session_type == SessionType.LECTURE
-        ).count()
-        
-        tutorials = self.db.query(TimetableEntry).filter(
-            TimetableEntry.session_type == SessionType.TUTORIAL
-        ).count()
-        
-        labs = self.db.query(TimetableEntry).filter(
-            TimetableEntry.session_type == SessionType.LAB
-        ).count()
-        
-        seminars = self.db.query(TimetableEntry).filter(
-            TimetableEntry.session_type == SessionType.SEMINAR
-        ).count()
-        
-        clubs = self.db.query(TimetableEntry).filter(
-            TimetableEntry.session_type == SessionType.CLUB
-        ).count()
+    def validate_schedule(self) -> Tuple[bool, List[str]]:
+        """Validate the stored schedule, reusing the last result until the engine writes again."""
+        if self._validation is None:
+            self._validation = self.validator.validate_full_schedule()
+        return self._validation
+    
+    def get_scheduling_report(self, validate: bool = True) -> Dict:
+        """
+        Get detailed scheduling report.
+        With validate=False only the counts are computed; is_valid is None.
+        """
+        # One GROUP BY instead of a COUNT per session type
+        counts = {session_type: 0 for session_type in SessionType}
+        counts.update(
+            self.db.query(TimetableEntry.session_type, func.count(TimetableEntry.id))
+            .group_by(TimetableEntry.session_type)
+            .all()
+        )
+        total_entries = sum(counts.values())
         
-        is_valid, conflicts = self.validator.validate_full_schedule()
+        is_valid, conflicts = self.validate_schedule() if validate else (None, [])
         
         return {
             "total_entries": total_entries,
-            "lectures": lectures,
-            "tutorials": tutorials,
-            "labs": labs,
-            "seminars": seminars,
-            "clubs": clubs,
+            "lectures": counts[SessionType.LECTURE],
+            "tutorials": counts[SessionType.TUTORIAL],
+            "labs": counts[SessionType.LAB],
+            "seminars": counts[SessionType.SEMINAR],
+            "clubs": counts[SessionType.CLUB],
             "is_valid": is_valid,
             "conflicts": len(conflicts),
             "failed_subjects": len(self.failed_subjects),
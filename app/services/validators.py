@@ -3,6 +3,7 @@ Constraint validators for the timetable scheduler.
 Validates all hard and soft constraints.
 """
 
+from collections import defaultdict
 from typing import List, Tuple, Optional
 from sqlalchemy.orm import Session
 from app.models.models import (
@@ -305,59 +306,47 @@ class ConstraintValidator:
         """
         conflicts = []
         
-        # Get all entries grouped by (day, period)
         all_entries = self.db.query(TimetableEntry).all()
         
-        entries_by_slot = {}
+        # Index entry ids by (resource, day, period) once instead of
+        # issuing a conflict query per entry
+        faculty_slots = defaultdict(list)
+        classroom_slots = defaultdict(list)
+        labroom_slots = defaultdict(list)
         for entry in all_entries:
-            key = (entry.day_of_week, entry.period_number)
-            if key not in entries_by_slot:
-                entries_by_slot[key] = []
-            entries_by_slot[key].append(entry)
+            slot = (entry.day_of_week, entry.period_number)
+            if entry.faculty_id is not None:
+                faculty_slots[(entry.faculty_id,) + slot].append(entry.id)
+            if entry.classroom_id and entry.session_type != SessionType.CLUB:
+                classroom_slots[(entry.classroom_id,) + slot].append(entry.id)
+            if entry.labroom_id:
+                labroom_slots[(entry.labroom_id,) + slot].append(entry.id)
+        
+        def has_clash(index, key, entry_id) -> bool:
+            return any(other_id != entry_id for other_id in index.get(key, ()))
         
         # Check for faculty conflicts
         for entry in all_entries:
-            faculty_conflicts = self.db.query(TimetableEntry).filter(
-                TimetableEntry.faculty_id == entry.faculty_id,
-                TimetableEntry.day_of_week == entry.day_of_week,
-                TimetableEntry.period_number == entry.period_number,
-                TimetableEntry.id != entry.id
-            ).all()
-            
-            if faculty_conflicts:
+            key = (entry.faculty_id, entry.day_of_week, entry.period_number)
+            if entry.faculty_id is not None and has_clash(faculty_slots, key, entry.id):
                 conflicts.append(
                     f"Faculty conflict: {entry.faculty.name} on {entry.day_of_week.value} P{entry.period_number}"
                 )
         
         # Check for classroom conflicts
         for entry in all_entries:
-            if entry.classroom_id:
-                classroom_conflicts = self.db.query(TimetableEntry).filter(
-                    TimetableEntry.classroom_id == entry.classroom_id,
-                    TimetableEntry.day_of_week == entry.day_of_week,
-                    TimetableEntry.period_number == entry.period_number,
-                    TimetableEntry.id != entry.id,
-                    TimetableEntry.session_type != SessionType.CLUB
-                ).all()
-                
-                if classroom_conflicts:
-                    conflicts.append(
-                        f"Classroom conflict: {entry.classroom.room_number} on {entry.day_of_week.value} P{entry.period_number}"
-                    )
+            key = (entry.classroom_id, entry.day_of_week, entry.period_number)
+            if entry.classroom_id and has_clash(classroom_slots, key, entry.id):
+                conflicts.append(
+                    f"Classroom conflict: {entry.classroom.room_number} on {entry.day_of_week.value} P{entry.period_number}"
+                )
         
         # Check for labroom conflicts
         for entry in all_entries:
-            if entry.labroom_id:
-                labroom_conflicts = self.db.query(TimetableEntry).filter(
-                    TimetableEntry.labroom_id == entry.labroom_id,
-                    TimetableEntry.day_of_week == entry.day_of_week,
-                    TimetableEntry.period_number == entry.period_number,
-                    TimetableEntry.id != entry.id
-                ).all()
-                
-                if labroom_conflicts:
-                    conflicts.append(
-                        f"Lab room conflict: {entry.labroom.room_number} on {entry.day_of_week.value} P{entry.period_number}"
-                    )
+            key = (entry.labroom_id, entry.day_of_week, entry.period_number)
+            if entry.labroom_id and has_clash(labroom_slots, key, entry.id):
+                conflicts.append(
+                    f"Lab room conflict: {entry.labroom.room_number} on {entry.day_of_week.value} P{entry.period_number}"
+                )
         
         return len(conflicts) == 0, conflicts
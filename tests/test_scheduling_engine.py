@@ -0,0 +1,146 @@
+"""
+Tests for the scheduling engine against an in-memory SQLite database.
+"""
+
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.models import (
+    Base, Branch, YearSection, Faculty, Classroom, LabRoom, Subject,
+    TimetableEntry, DayOfWeek, SessionType
+)
+from app.services.scheduling_engine import SchedulerEngine, SchedulingTask
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def seed_feasible(db):
+    """Three sections of one branch sharing faculty, classrooms and lab rooms."""
+    branch = Branch(code="CSE", name="Computer Science")
+    db.add(branch)
+    db.flush()
+
+    faculty = [Faculty(employee_id=f"F{i}", name=f"Faculty {i}") for i in range(6)]
+    classrooms = [Classroom(room_number=f"C{i}", capacity=60) for i in range(3)]
+    labrooms = [LabRoom(room_number=f"L{i}", lab_type="General Lab", capacity=30) for i in range(2)]
+    db.add_all(faculty + classrooms + labrooms)
+    db.flush()
+
+    subjects = []
+    for s, section in enumerate("ABC"):
+        db.add(YearSection(branch_id=branch.id, year=2, section=section))
+        for k in range(4):
+            subjects.append(Subject(
+                code=f"CS2{k}{section}",
+                name=f"Subject {k}",
+                branch_id=branch.id,
+                year=2,
+                section=section,
+                lectures_per_week=3,
+                tutorials_per_week=1,
+                lab_periods_per_week=1 if k < 2 else 0,
+                seminar_periods_per_week=1 if k == 0 else 0,
+                lab_duration=2 + (k + s) % 2,
+                faculty_id=faculty[(k + s) % len(faculty)].id,
+                classroom_id=classrooms[s].id,
+                labroom_id=labrooms[k % len(labrooms)].id,
+            ))
+    db.add_all(subjects)
+    db.commit()
+    return subjects
+
+
+def test_schedule_all_places_every_session(db):
+    subjects = seed_feasible(db)
+
+    success, report = SchedulerEngine(db, seed=7).schedule_all()
+
+    assert success
+    assert report["failed_subjects"] == []
+    entries = db.query(TimetableEntry).all()
+    placed = Counter((e.subject_id, e.session_type) for e in entries)
+    for subject in subjects:
+        assert placed[(subject.id, SessionType.LECTURE)] == subject.lectures_per_week
+        assert placed[(subject.id, SessionType.TUTORIAL)] == subject.tutorials_per_week
+        assert placed[(subject.id, SessionType.SEMINAR)] == subject.seminar_periods_per_week
+        assert placed[(subject.id, SessionType.LAB)] == subject.lab_periods_per_week * subject.lab_duration
+
+
+def test_schedule_all_respects_hard_constraints(db):
+    seed_feasible(db)
+
+    SchedulerEngine(db, seed=7).schedule_all()
+
+    entries = db.query(TimetableEntry).all()
+    for attr in ("faculty_id", "year_section_id", "classroom_id", "labroom_id"):
+        slots = Counter(
+            (getattr(e, attr), e.day_of_week, e.period_number)
+            for e in entries if getattr(e, attr) is not None
+        )
+        assert max(slots.values()) == 1, f"{attr} double-booked"
+
+    for e in entries:
+        if e.session_type == SessionType.LAB:
+            assert e.period_number >= 3
+        if e.session_type in (SessionType.TUTORIAL, SessionType.SEMINAR) and e.day_of_week == DayOfWeek.THURSDAY:
+            assert e.period_number not in (1, 7)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_restart_searches_given_up_tasks_again(db, seed):
+    # One faculty cannot teach 41 + 1 lectures in 41 slots, so every attempt dead-ends;
+    # whichever task is given up must get a fresh domain, and budget, on the next attempt
+    engine = SchedulerEngine(db, seed=seed)
+    engine.MAX_BACKTRACKS = 5
+    tasks = [
+        SchedulingTask(1, "A", SessionType.LECTURE, 41, faculty_id=1, year_section_id=1, room_id=1),
+        SchedulingTask(2, "B", SessionType.LECTURE, 1, faculty_id=1, year_section_id=2, room_id=2),
+    ]
+
+    placements, unplaced = engine._solve(tasks)
+
+    assert len(placements) == 41
+    assert sum(unplaced.values()) == 1
+    assert engine.backtrack_count == engine.RESTARTS * engine.MAX_BACKTRACKS
+
+
+def test_schedule_clubs_fills_free_thursday_slots(db):
+    seed_feasible(db)
+    engine = SchedulerEngine(db, seed=7)
+    engine.schedule_all()
+
+    assert engine.schedule_clubs()
+    assert engine.schedule_clubs()  # a second run finds every slot taken
+
+    thursday = db.query(TimetableEntry).filter(TimetableEntry.day_of_week == DayOfWeek.THURSDAY).all()
+    slots = Counter((e.year_section_id, e.period_number) for e in thursday)
+    assert max(slots.values()) == 1
+    clubs = {(e.year_section_id, e.period_number) for e in thursday if e.session_type == SessionType.CLUB}
+    for year_section in db.query(YearSection):
+        assert (year_section.id, 7) in clubs
+        assert (year_section.id, 1) in slots
+
+
+def test_schedule_clubs_uses_both_slots_when_free(db):
+    seed_feasible(db)
+
+    assert SchedulerEngine(db).schedule_clubs()
+
+    clubs = Counter(
+        e.period_number for e in db.query(TimetableEntry)
+        if e.session_type == SessionType.CLUB and e.day_of_week == DayOfWeek.THURSDAY
+    )
+    assert clubs == {1: 3, 7: 3}